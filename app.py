@@ -1,25 +1,65 @@
-from flask import Flask, jsonify, request, redirect
+from flask import Flask, g, jsonify, request, redirect
+from flask.json.provider import DefaultJSONProvider
+import orjson
 import sqlite3
 import os
+import sys
+import atexit
+import logging
+import threading
+import weakref
+from pathlib import Path
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 import hashlib
+import hmac
 from datetime import datetime, timedelta
 import json
 import requests
+from requests.adapters import HTTPAdapter
 # tweepy import moved to where it's used for Python 3.13 compatibility
 import secrets
+import time
 import base64
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from functools import lru_cache
 from cryptography.fernet import Fernet
 
+# Posting-path logger; messages are only formatted when the level is enabled.
+# Writes to stdout like the print calls it replaced (set TWITTER_LOG_LEVEL=DEBUG for more detail)
+twitter_logger = logging.getLogger('twitter')
+if not twitter_logger.handlers:
+    _twitter_log_handler = logging.StreamHandler(sys.stdout)
+    _twitter_log_handler.setFormatter(logging.Formatter('%(message)s'))
+    twitter_logger.addHandler(_twitter_log_handler)
+    # getLevelName maps a valid name to its number; anything else falls back to INFO
+    _twitter_log_level = logging.getLevelName(os.environ.get('TWITTER_LOG_LEVEL', 'INFO').upper())
+    twitter_logger.setLevel(_twitter_log_level if isinstance(_twitter_log_level, int) else logging.INFO)
+    twitter_logger.propagate = False
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson for faster response serialization"""
+    
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_SORT_KEYS if self.sort_keys else 0
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 # Database path
 DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'twitter_manager.db')
 
+# Bump when adding a column migration or index to init_database
+SCHEMA_VERSION = 1
+
 # Ensure instance directory exists
 os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
 
@@ -29,6 +69,8 @@ if not VALID_API_KEY:
     print("WARNING: No API_KEY found in environment. Please set it in .env file.")
     print("For testing, you can use: 2043adb52a7468621a9245c94d702e4bed5866b0ec52772f203286f823a50bbb")
     VALID_API_KEY = "test-api-key-replace-in-production"
+VALID_API_KEY_HASH = hashlib.sha256(VALID_API_KEY.encode()).hexdigest()
+VALID_API_KEY_BYTES = VALID_API_KEY.encode()
 
 # Get encryption key from environment
 ENCRYPTION_KEY = os.environ.get('ENCRYPTION_KEY')
@@ -53,102 +95,208 @@ if 'localhost' in TWITTER_CALLBACK_URL and os.environ.get('FLASK_ENV') == 'produ
     print("WARNING: Using localhost callback URL in production environment!")
     print("Please set TWITTER_CALLBACK_URL in .env file to your server's address.")
 
+# Basic auth header for the OAuth2 token endpoint, built once from the client credentials
+TWITTER_BASIC_AUTH = 'Basic ' + base64.b64encode(f"{TWITTER_CLIENT_ID}:{TWITTER_CLIENT_SECRET}".encode('ascii')).decode('ascii')
+
+# Unfinished OAuth flows older than this are purged
+OAUTH_STATE_TTL_MINUTES = 10
+
+# Shared HTTP session so Twitter API calls reuse pooled keep-alive connections
+TWITTER_API_TIMEOUT = 10
+twitter_session = requests.Session()
+twitter_session.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=3))
+
 # Mock mode disabled - we want real Twitter posting
 MOCK_TWITTER_POSTING = False
 
 # Allow runtime toggle
 mock_mode_override = {'enabled': False}
 
-def get_db():
-    """Get database connection"""
-    conn = sqlite3.connect(DB_PATH)
+# Per-thread database connections, reused across requests
+_db_local = threading.local()
+_db_pool = weakref.WeakSet()
+
+class PooledConnection:
+    """Thread-local SQLite connection whose close() returns it to the pool"""
+    
+    def __init__(self, conn):
+        self._conn = conn
+        self._checkouts = 0
+    
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+    
+    def close(self):
+        """Release one checkout; discard uncommitted work once the last one is released"""
+        self._checkouts = max(self._checkouts - 1, 0)
+        if self._checkouts == 0 and self._conn.in_transaction:
+            self._conn.rollback()
+
+def _open_db(readonly=False):
+    """Open and configure a new database connection (WAL mode, so readers don't block on writers)"""
+    if readonly:
+        conn = sqlite3.connect(f'{Path(DB_PATH).as_uri()}?mode=ro', uri=True, cached_statements=256)
+    else:
+        conn = sqlite3.connect(DB_PATH, cached_statements=256)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
     conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.execute('PRAGMA mmap_size=268435456')
+    conn.execute('PRAGMA cache_size=-64000')
+    return conn
+
+def get_db(readonly=False):
+    """Get this thread's pooled database connection (read-only ones skip write-path setup)"""
+    slot = 'readonly_conn' if readonly else 'conn'
+    conn = getattr(_db_local, slot, None)
+    if conn is None:
+        conn = PooledConnection(_open_db(readonly))
+        setattr(_db_local, slot, conn)
+        _db_pool.add(conn)
+    conn._checkouts += 1
     return conn
 
+@atexit.register
+def close_db_pool():
+    """Close all pooled database connections on shutdown"""
+    for conn in list(_db_pool):
+        try:
+            conn._conn.close()
+        except sqlite3.ProgrammingError:
+            pass  # Owned by another thread; released with that thread's local storage
+
 def check_api_key():
     """Simple API key check"""
     api_key = request.headers.get('X-API-Key')
     if not api_key:
         api_key = request.args.get('api_key')
     
-    if api_key != VALID_API_KEY:
+    # Constant-time compare so response timing doesn't leak the key
+    if not api_key or not hmac.compare_digest(api_key.encode(), VALID_API_KEY_BYTES):
         return False
     return True
 
+def encrypt_token(token):
+    """Encrypt a token for storage (None passes through)"""
+    if not token:
+        return None
+    return fernet.encrypt(token.encode()).decode()
+
+@lru_cache(maxsize=1024)
 def decrypt_token(encrypted_token):
-    """Decrypt an encrypted token"""
+    """Decrypt an encrypted token (cached by ciphertext, which changes whenever the token does)"""
     try:
-        return fernet.decrypt(encrypted_token.encode()).decode()
+        return fernet.decrypt(encrypted_token).decode()
     except:
         return encrypted_token  # Return as-is if decryption fails
 
+def _preview(content):
+    """Truncate tweet content to a 50-character preview"""
+    return content[:50] + '...' if len(content) > 50 else content
+
+@lru_cache(maxsize=4096)
+def _lookup_twitter_user_id(username, access_token):
+    """Look up a Twitter user ID by username (cached; failures raise and are not cached)"""
+    response = twitter_session.get(
+        f'https://api.twitter.com/2/users/by/username/{username}',
+        headers={'Authorization': f'Bearer {access_token}'},
+        timeout=TWITTER_API_TIMEOUT
+    )
+    
+    if response.status_code != 200:
+        raise LookupError(f"User lookup failed for {username} (status {response.status_code})")
+    
+    return orjson.loads(response.content)['data']['id']
+
+def get_twitter_user_id(username, access_token):
+    """Get the Twitter user ID for a username, or None if the lookup fails"""
+    try:
+        return _lookup_twitter_user_id(username, access_token)
+    except LookupError:
+        return None
+
 def post_to_twitter(account_id, tweet_text):
     """Post a tweet to Twitter using the account's credentials"""
-    conn = get_db()
-    
     # Get account credentials
-    account = conn.execute(
-        'SELECT * FROM twitter_account WHERE id = ?', 
-        (account_id,)
-    ).fetchone()
+    with closing(get_db()) as conn:
+        account = conn.execute(
+            'SELECT username, access_token, access_token_secret FROM twitter_account WHERE id = ?',
+            (account_id,)
+        ).fetchone()
     
     if not account:
-        conn.close()
         return False, "Account not found"
     
     # Check if mock mode
     if mock_mode_override['enabled']:
-        conn.close()
         mock_tweet_id = f"mock_{datetime.now().timestamp()}"
-        print(f"[MOCK MODE] Would post tweet for {account['username']}: {tweet_text}")
+        twitter_logger.info("[MOCK MODE] Would post tweet for %s: %s", account['username'], tweet_text)
         return True, mock_tweet_id
     
     try:
-        # Decrypt tokens
-        access_token = decrypt_token(account['access_token'])
-        access_token_secret = decrypt_token(account['access_token_secret']) if account['access_token_secret'] else None
-        
-        print(f"Posting tweet for account: {account['username']}")
-        print(f"OAuth type: {'OAuth 2.0' if not access_token_secret or not access_token_secret.strip() else 'OAuth 1.0a'}")
+        twitter_logger.debug("Posting tweet for account: %s (OAuth type: %s)",
+                             account['username'], 'OAuth 1.0a' if account['access_token_secret'] else 'OAuth 2.0')
         
-        # Check if OAuth 2.0 (no secret) or OAuth 1.0a (with secret)
-        if access_token_secret and access_token_secret.strip():
+        # Check if OAuth 2.0 (no secret) or OAuth 1.0a (with secret); OAuth 2.0 accounts store NULL,
+        # so the secret's presence is enough and it never needs decrypting
+        if account['access_token_secret']:
             # OAuth 1.0a - use direct API call (tweepy has Python 3.13 issues)
-            conn.close()
             return False, "OAuth 1.0a not supported. Please re-authorize with OAuth 2.0."
         else:
             # OAuth 2.0 - direct API call
+            access_token = decrypt_token(account['access_token'])
             headers = {
                 'Authorization': f'Bearer {access_token}',
                 'Content-Type': 'application/json'
             }
             
-            data = {'text': tweet_text}
+            # Pre-encode with orjson; Content-Type is already set above
+            body = orjson.dumps({'text': tweet_text})
             
-            response = requests.post(
+            response = twitter_session.post(
                 'https://api.twitter.com/2/tweets',
                 headers=headers,
-                json=data
+                data=body,
+                timeout=TWITTER_API_TIMEOUT
             )
             
+            # Read the body once and parse or decode it from the same bytes
+            raw = response.content
+            
             if response.status_code != 201:
-                conn.close()
-                error_msg = f"Twitter API error (status {response.status_code}): {response.text}"
-                print(error_msg)
+                error_msg = f"Twitter API error (status {response.status_code}): {raw.decode('utf-8', 'replace')}"
+                twitter_logger.warning(error_msg)
                 return False, error_msg
             
-            tweet_id = response.json()['data']['id']
+            tweet_id = orjson.loads(raw)['data']['id']
         
-        conn.close()
-        print(f"Successfully posted tweet with ID: {tweet_id}")
+        twitter_logger.info("Successfully posted tweet with ID: %s", tweet_id)
         return True, tweet_id
         
     except Exception as e:
-        conn.close()
         error_msg = f"Exception during posting: {str(e)}"
-        print(error_msg)
+        twitter_logger.error(error_msg)
         return False, error_msg
 
+_timestamp_cache = {}
+
+def cached_utc_timestamp():
+    """UTC ISO timestamp at second precision, formatted at most once per second"""
+    now = int(time.time())
+    timestamp = _timestamp_cache.get(now)
+    if timestamp is None:
+        timestamp = datetime.utcfromtimestamp(now).isoformat()
+        _timestamp_cache.clear()
+        _timestamp_cache[now] = timestamp
+    return timestamp
+
+def request_ts():
+    """Request timestamp, computed on first use and reused for every write in the request"""
+    if 'request_ts' not in g:
+        g.request_ts = datetime.utcnow().isoformat()
+    return g.request_ts
+
 # WORKING ENDPOINTS
 
 @app.route('/api/v1/health', methods=['GET'])
@@ -156,7 +304,7 @@ def health():
     """Health check - no auth required"""
     return jsonify({
         'status': 'healthy',
-        'timestamp': datetime.utcnow().isoformat(),
+        'timestamp': cached_utc_timestamp(),
         'version': '2.0.0-simple'
     })
 
@@ -180,31 +328,28 @@ def get_accounts():
     account_type = request.args.get('type')
     
     try:
-        conn = get_db()
-        if account_type:
-            cursor = conn.execute(
-                'SELECT id, username, status, account_type, created_at FROM twitter_account WHERE account_type = ? ORDER BY created_at DESC',
-                (account_type,)
-            )
-        else:
-            cursor = conn.execute('SELECT id, username, status, account_type, created_at FROM twitter_account ORDER BY created_at DESC')
-        accounts = cursor.fetchall()
-        conn.close()
-        
-        result = []
-        for acc in accounts:
-            result.append({
-                'id': acc['id'],
-                'username': acc['username'],
-                'status': acc['status'],
-                'account_type': acc['account_type'] if 'account_type' in acc.keys() else 'managed',
-                'created_at': acc['created_at']
+        with closing(get_db(readonly=True)) as conn:
+            if account_type:
+                cursor = conn.execute(
+                    "SELECT id, username, status, COALESCE(account_type, 'managed') as account_type, created_at FROM twitter_account WHERE account_type = ? ORDER BY created_at DESC",
+                    (account_type,)
+                )
+            else:
+                cursor = conn.execute("SELECT id, username, status, COALESCE(account_type, 'managed') as account_type, created_at FROM twitter_account ORDER BY created_at DESC")
+            result = []
+            for acc in cursor:
+                result.append({
+                    'id': acc['id'],
+                    'username': acc['username'],
+                    'status': acc['status'],
+                    'account_type': acc['account_type'],
+                    'created_at': acc['created_at']
+                })
+            
+            return jsonify({
+                'accounts': result,
+                'total': len(result)
             })
-        
-        return jsonify({
-            'accounts': result,
-            'total': len(result)
-        })
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -216,20 +361,19 @@ def get_account(account_id):
         return jsonify({'error': 'Invalid API key'}), 401
     
     try:
-        conn = get_db()
-        cursor = conn.execute('SELECT * FROM twitter_account WHERE id = ?', (account_id,))
-        account = cursor.fetchone()
-        conn.close()
-        
-        if not account:
-            return jsonify({'error': 'Account not found'}), 404
-        
-        return jsonify({
-            'id': account['id'],
-            'username': account['username'],
-            'status': account['status'],
-            'created_at': account['created_at']
-        })
+        with closing(get_db(readonly=True)) as conn:
+            cursor = conn.execute('SELECT id, username, status, created_at FROM twitter_account WHERE id = ?', (account_id,))
+            account = cursor.fetchone()
+            
+            if not account:
+                return jsonify({'error': 'Account not found'}), 404
+            
+            return jsonify({
+                'id': account['id'],
+                'username': account['username'],
+                'status': account['status'],
+                'created_at': account['created_at']
+            })
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -250,33 +394,30 @@ def set_account_type(account_id):
         return jsonify({'error': 'account_type must be "managed" or "list_owner"'}), 400
     
     try:
-        conn = get_db()
-        
-        # Check if account exists
-        account = conn.execute(
-            'SELECT id, username FROM twitter_account WHERE id = ?',
-            (account_id,)
-        ).fetchone()
-        
-        if not account:
-            conn.close()
-            return jsonify({'error': 'Account not found'}), 404
-        
-        # Update account type
-        conn.execute(
-            'UPDATE twitter_account SET account_type = ?, updated_at = ? WHERE id = ?',
-            (account_type, datetime.utcnow().isoformat(), account_id)
-        )
-        
-        conn.commit()
-        conn.close()
-        
-        return jsonify({
-            'message': f'Account type updated to {account_type}',
-            'account_id': account_id,
-            'username': account['username'],
-            'account_type': account_type
-        })
+        with closing(get_db()) as conn:
+            # Check if account exists
+            account = conn.execute(
+                'SELECT id, username FROM twitter_account WHERE id = ?',
+                (account_id,)
+            ).fetchone()
+            
+            if not account:
+                return jsonify({'error': 'Account not found'}), 404
+            
+            # Update account type
+            conn.execute(
+                'UPDATE twitter_account SET account_type = ?, updated_at = ? WHERE id = ?',
+                (account_type, request_ts(), account_id)
+            )
+            
+            conn.commit()
+            
+            return jsonify({
+                'message': f'Account type updated to {account_type}',
+                'account_id': account_id,
+                'username': account['username'],
+                'account_type': account_type
+            })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -292,19 +433,18 @@ def create_tweet():
         return jsonify({'error': 'Missing text or account_id'}), 400
     
     try:
-        conn = get_db()
-        cursor = conn.execute(
-            'INSERT INTO tweet (twitter_account_id, content, status, created_at) VALUES (?, ?, ?, ?)',
-            (data['account_id'], data['text'], 'pending', datetime.utcnow().isoformat())
-        )
-        tweet_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        
-        return jsonify({
-            'message': 'Tweet created successfully',
-            'tweet_id': tweet_id
-        }), 201
+        with closing(get_db()) as conn:
+            cursor = conn.execute(
+                'INSERT INTO tweet (twitter_account_id, content, status, created_at) VALUES (?, ?, ?, ?)',
+                (data['account_id'], data['text'], 'pending', request_ts())
+            )
+            tweet_id = cursor.lastrowid
+            conn.commit()
+            
+            return jsonify({
+                'message': 'Tweet created successfully',
+                'tweet_id': tweet_id
+            }), 201
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -316,31 +456,31 @@ def get_tweets():
         return jsonify({'error': 'Invalid API key'}), 401
     
     try:
-        conn = get_db()
-        cursor = conn.execute('''
-            SELECT t.id, t.content as text, t.status, t.created_at, a.username 
-            FROM tweet t 
-            JOIN twitter_account a ON t.twitter_account_id = a.id 
-            ORDER BY t.created_at DESC 
-            LIMIT 50
-        ''')
-        tweets = cursor.fetchall()
-        conn.close()
-        
-        result = []
-        for tweet in tweets:
-            result.append({
-                'id': tweet['id'],
-                'text': tweet['text'],
-                'status': tweet['status'],
-                'created_at': tweet['created_at'],
-                'username': tweet['username']
+        with closing(get_db(readonly=True)) as conn:
+            # Plain tuple rows - unpacked positionally, no sqlite3.Row lookups
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            cursor.execute('''
+                SELECT t.id, t.content as text, t.status, t.created_at, a.username 
+                FROM tweet t 
+                JOIN twitter_account a ON t.twitter_account_id = a.id 
+                ORDER BY t.created_at DESC 
+                LIMIT 50
+            ''')
+            result = []
+            for tweet_id, text, status, created_at, username in cursor:
+                result.append({
+                    'id': tweet_id,
+                    'text': text,
+                    'status': status,
+                    'created_at': created_at,
+                    'username': username
+                })
+            
+            return jsonify({
+                'tweets': result,
+                'total': len(result)
             })
-        
-        return jsonify({
-            'tweets': result,
-            'total': len(result)
-        })
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -365,13 +505,17 @@ def twitter_auth():
     state = secrets.token_urlsafe(32)
     
     # Store code_verifier and state (in production, use Redis or database)
-    conn = get_db()
-    conn.execute(
-        'INSERT INTO oauth_state (state, code_verifier, created_at) VALUES (?, ?, ?)',
-        (state, code_verifier, datetime.utcnow().isoformat())
-    )
-    conn.commit()
-    conn.close()
+    with closing(get_db()) as conn:
+        conn.execute(
+            'INSERT INTO oauth_state (state, code_verifier, created_at) VALUES (?, ?, ?)',
+            (state, code_verifier, request_ts())
+        )
+        # Purge abandoned flows in the same transaction
+        conn.execute(
+            'DELETE FROM oauth_state WHERE created_at < ?',
+            ((datetime.utcnow() - timedelta(minutes=OAUTH_STATE_TTL_MINUTES)).isoformat(),)
+        )
+        conn.commit()
     
     # Build OAuth URL
     params = {
@@ -411,100 +555,93 @@ def auth_callback():
         return jsonify({'error': 'Missing code or state'}), 400
     
     # Retrieve code_verifier from database
-    conn = get_db()
-    oauth_data = conn.execute(
-        'SELECT code_verifier FROM oauth_state WHERE state = ?',
-        (state,)
-    ).fetchone()
-    
-    if not oauth_data:
-        conn.close()
-        return jsonify({'error': 'Invalid state'}), 400
-    
-    code_verifier = oauth_data['code_verifier']
-    
-    # Exchange code for tokens
-    token_url = 'https://api.twitter.com/2/oauth2/token'
-    
-    auth_string = f"{TWITTER_CLIENT_ID}:{TWITTER_CLIENT_SECRET}"
-    auth_bytes = auth_string.encode('ascii')
-    auth_b64 = base64.b64encode(auth_bytes).decode('ascii')
-    
-    headers = {
-        'Authorization': f'Basic {auth_b64}',
-        'Content-Type': 'application/x-www-form-urlencoded'
-    }
-    
-    data = {
-        'code': code,
-        'grant_type': 'authorization_code',
-        'client_id': TWITTER_CLIENT_ID,
-        'redirect_uri': TWITTER_CALLBACK_URL,
-        'code_verifier': code_verifier
-    }
-    
-    response = requests.post(token_url, headers=headers, data=data)
-    
-    if response.status_code != 200:
-        conn.close()
-        return jsonify({
-            'error': 'Failed to exchange code for tokens',
-            'details': response.json()
-        }), 400
-    
-    tokens = response.json()
-    access_token = tokens['access_token']
-    refresh_token = tokens.get('refresh_token')
-    
-    # Get user info
-    user_response = requests.get(
-        'https://api.twitter.com/2/users/me',
-        headers={'Authorization': f'Bearer {access_token}'}
-    )
-    
-    if user_response.status_code != 200:
-        conn.close()
-        return jsonify({'error': 'Failed to get user info'}), 400
-    
-    user_data = user_response.json()['data']
-    username = user_data['username']
-    
-    # Encrypt tokens
-    encrypted_access_token = fernet.encrypt(access_token.encode()).decode()
-    encrypted_refresh_token = fernet.encrypt(refresh_token.encode()).decode() if refresh_token else None
-    
-    # Check if account exists
-    existing = conn.execute(
-        'SELECT id FROM twitter_account WHERE username = ?',
-        (username,)
-    ).fetchone()
-    
-    if existing:
-        # Update existing account
-        conn.execute(
-            'UPDATE twitter_account SET access_token = ?, refresh_token = ?, status = ?, updated_at = ? WHERE username = ?',
-            (encrypted_access_token, encrypted_refresh_token, 'active', datetime.utcnow().isoformat(), username)
-        )
-        account_id = existing['id']
-    else:
-        # Create new account
-        cursor = conn.execute(
-            'INSERT INTO twitter_account (username, access_token, access_token_secret, refresh_token, status, created_at) VALUES (?, ?, ?, ?, ?, ?)',
-            (username, encrypted_access_token, None, encrypted_refresh_token, 'active', datetime.utcnow().isoformat())
+    with closing(get_db()) as conn:
+        oauth_data = conn.execute(
+            'SELECT code_verifier FROM oauth_state WHERE state = ?',
+            (state,)
+        ).fetchone()
+        
+        if not oauth_data:
+            return jsonify({'error': 'Invalid state'}), 400
+        
+        code_verifier = oauth_data['code_verifier']
+        
+        # Exchange code for tokens
+        token_url = 'https://api.twitter.com/2/oauth2/token'
+        
+        headers = {
+            'Authorization': TWITTER_BASIC_AUTH,
+            'Content-Type': 'application/x-www-form-urlencoded'
+        }
+        
+        data = {
+            'code': code,
+            'grant_type': 'authorization_code',
+            'client_id': TWITTER_CLIENT_ID,
+            'redirect_uri': TWITTER_CALLBACK_URL,
+            'code_verifier': code_verifier
+        }
+        
+        response = twitter_session.post(token_url, headers=headers, data=data, timeout=TWITTER_API_TIMEOUT)
+        
+        if response.status_code != 200:
+            return jsonify({
+                'error': 'Failed to exchange code for tokens',
+                'details': response.json()
+            }), 400
+        
+        tokens = orjson.loads(response.content)
+        access_token = tokens['access_token']
+        refresh_token = tokens.get('refresh_token')
+        
+        # Get user info
+        user_response = twitter_session.get(
+            'https://api.twitter.com/2/users/me',
+            headers={'Authorization': f'Bearer {access_token}'},
+            timeout=TWITTER_API_TIMEOUT
         )
-        account_id = cursor.lastrowid
-    
-    # Clean up oauth_state
-    conn.execute('DELETE FROM oauth_state WHERE state = ?', (state,))
-    
-    conn.commit()
-    conn.close()
-    
-    return jsonify({
-        'message': 'Authorization successful',
-        'account_id': account_id,
-        'username': username
-    })
+        
+        if user_response.status_code != 200:
+            return jsonify({'error': 'Failed to get user info'}), 400
+        
+        user_data = orjson.loads(user_response.content)['data']
+        username = user_data['username']
+        
+        # Encrypt tokens
+        encrypted_access_token = encrypt_token(access_token)
+        encrypted_refresh_token = encrypt_token(refresh_token)
+        
+        # Check if account exists
+        existing = conn.execute(
+            'SELECT id FROM twitter_account WHERE username = ?',
+            (username,)
+        ).fetchone()
+        
+        if existing:
+            # Update existing account
+            conn.execute(
+                'UPDATE twitter_account SET access_token = ?, refresh_token = ?, twitter_user_id = ?, status = ?, updated_at = ? WHERE username = ?',
+                (encrypted_access_token, encrypted_refresh_token, user_data['id'], 'active', request_ts(), username)
+            )
+            account_id = existing['id']
+        else:
+            # Create new account
+            cursor = conn.execute(
+                'INSERT INTO twitter_account (username, twitter_user_id, access_token, access_token_secret, refresh_token, status, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (username, user_data['id'], encrypted_access_token, None, encrypted_refresh_token, 'active', request_ts())
+            )
+            account_id = cursor.lastrowid
+        
+        # Clean up oauth_state
+        conn.execute('DELETE FROM oauth_state WHERE state = ?', (state,))
+        
+        conn.commit()
+        
+        return jsonify({
+            'message': 'Authorization successful',
+            'account_id': account_id,
+            'username': username
+        })
 
 @app.route('/api/v1/mock-mode', methods=['GET', 'POST'])
 def mock_mode():
@@ -530,29 +667,33 @@ def get_stats():
         return jsonify({'error': 'Invalid API key'}), 401
     
     try:
-        conn = get_db()
-        
-        # Get counts
-        accounts_count = conn.execute('SELECT COUNT(*) FROM twitter_account').fetchone()[0]
-        tweets_count = conn.execute('SELECT COUNT(*) FROM tweet').fetchone()[0]
-        pending_count = conn.execute('SELECT COUNT(*) FROM tweet WHERE status = "pending"').fetchone()[0]
-        posted_count = conn.execute('SELECT COUNT(*) FROM tweet WHERE status = "posted"').fetchone()[0]
-        failed_count = conn.execute('SELECT COUNT(*) FROM tweet WHERE status = "failed"').fetchone()[0]
-        
-        conn.close()
-        
-        return jsonify({
-            'accounts': {
-                'total': accounts_count,
-                'active': accounts_count  # Simplified
-            },
-            'tweets': {
-                'total': tweets_count,
-                'pending': pending_count,
-                'posted': posted_count,
-                'failed': failed_count
-            }
-        })
+        with closing(get_db(readonly=True)) as conn:
+            # Get counts - one scan per table using conditional aggregation
+            accounts = conn.execute('''
+                SELECT COUNT(*) as total,
+                       COALESCE(SUM(status = 'active'), 0) as active
+                FROM twitter_account
+            ''').fetchone()
+            tweets = conn.execute('''
+                SELECT COUNT(*) as total,
+                       COALESCE(SUM(status = 'pending'), 0) as pending,
+                       COALESCE(SUM(status = 'posted'), 0) as posted,
+                       COALESCE(SUM(status = 'failed'), 0) as failed
+                FROM tweet
+            ''').fetchone()
+            
+            return jsonify({
+                'accounts': {
+                    'total': accounts['total'],
+                    'active': accounts['active']
+                },
+                'tweets': {
+                    'total': tweets['total'],
+                    'pending': tweets['pending'],
+                    'posted': tweets['posted'],
+                    'failed': tweets['failed']
+                }
+            })
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -564,105 +705,99 @@ def post_tweet(tweet_id):
         return jsonify({'error': 'Invalid API key'}), 401
     
     try:
-        conn = get_db()
-        
-        # Get the tweet
-        tweet = conn.execute(
-            'SELECT * FROM tweet WHERE id = ? AND status = "pending"',
-            (tweet_id,)
-        ).fetchone()
-        
-        if not tweet:
-            conn.close()
-            return jsonify({'error': 'Tweet not found or already posted'}), 404
-        
-        # Post to Twitter
-        success, result = post_to_twitter(tweet['twitter_account_id'], tweet['content'])
-        
-        if success:
-            # Update tweet status to posted
-            conn.execute(
-                'UPDATE tweet SET status = ?, tweet_id = ?, posted_time = ? WHERE id = ?',
-                ('posted', result, datetime.utcnow().isoformat(), tweet_id)
-            )
-            conn.commit()
-            conn.close()
-            
-            return jsonify({
-                'message': 'Tweet posted successfully',
-                'tweet_id': tweet_id,
-                'twitter_tweet_id': result
-            })
-        else:
-            # Update tweet status to failed
-            conn.execute(
-                'UPDATE tweet SET status = ? WHERE id = ?',
-                ('failed', tweet_id)
-            )
-            conn.commit()
-            conn.close()
+        with closing(get_db()) as conn:
+            # Get the tweet
+            tweet = conn.execute(
+                "SELECT twitter_account_id, content FROM tweet WHERE id = ? AND status = 'pending'",
+                (tweet_id,)
+            ).fetchone()
             
-            return jsonify({
-                'error': 'Failed to post tweet',
-                'reason': result
-            }), 500
+            if not tweet:
+                return jsonify({'error': 'Tweet not found or already posted'}), 404
             
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/api/v1/tweets/post-pending', methods=['POST'])
-def post_pending_tweets():
-    """Post all pending tweets"""
-    if not check_api_key():
-        return jsonify({'error': 'Invalid API key'}), 401
-    
-    try:
-        conn = get_db()
-        
-        # Get all pending tweets
-        pending_tweets = conn.execute(
-            'SELECT * FROM tweet WHERE status = "pending" ORDER BY created_at'
-        ).fetchall()
-        
-        results = {
-            'total': len(pending_tweets),
-            'posted': 0,
-            'failed': 0,
-            'details': []
-        }
-        
-        for tweet in pending_tweets:
+            # Post to Twitter
             success, result = post_to_twitter(tweet['twitter_account_id'], tweet['content'])
             
             if success:
-                # Update to posted
+                # Update tweet status to posted
                 conn.execute(
                     'UPDATE tweet SET status = ?, tweet_id = ?, posted_time = ? WHERE id = ?',
-                    ('posted', result, datetime.utcnow().isoformat(), tweet['id'])
+                    ('posted', result, datetime.utcnow().isoformat(), tweet_id)
                 )
-                results['posted'] += 1
-                results['details'].append({
-                    'tweet_id': tweet['id'],
-                    'status': 'posted',
+                conn.commit()
+                
+                return jsonify({
+                    'message': 'Tweet posted successfully',
+                    'tweet_id': tweet_id,
                     'twitter_tweet_id': result
                 })
             else:
-                # Update to failed
+                # Update tweet status to failed
                 conn.execute(
                     'UPDATE tweet SET status = ? WHERE id = ?',
-                    ('failed', tweet['id'])
+                    ('failed', tweet_id)
                 )
-                results['failed'] += 1
-                results['details'].append({
-                    'tweet_id': tweet['id'],
-                    'status': 'failed',
-                    'error': result
-                })
-        
-        conn.commit()
-        conn.close()
-        
-        return jsonify(results)
+                conn.commit()
+                
+                return jsonify({
+                    'error': 'Failed to post tweet',
+                    'reason': result
+                }), 500
+            
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/v1/tweets/post-pending', methods=['POST'])
+def post_pending_tweets():
+    """Post all pending tweets"""
+    if not check_api_key():
+        return jsonify({'error': 'Invalid API key'}), 401
+    
+    try:
+        with closing(get_db()) as conn:
+            # Get all pending tweets
+            pending_tweets = conn.execute(
+                "SELECT id, twitter_account_id, content FROM tweet WHERE status = 'pending' ORDER BY created_at"
+            ).fetchall()
+            
+            results = {
+                'total': len(pending_tweets),
+                'posted': 0,
+                'failed': 0,
+                'details': []
+            }
+            
+            for tweet in pending_tweets:
+                success, result = post_to_twitter(tweet['twitter_account_id'], tweet['content'])
+                
+                if success:
+                    # Update to posted
+                    conn.execute(
+                        'UPDATE tweet SET status = ?, tweet_id = ?, posted_time = ? WHERE id = ?',
+                        ('posted', result, datetime.utcnow().isoformat(), tweet['id'])
+                    )
+                    results['posted'] += 1
+                    results['details'].append({
+                        'tweet_id': tweet['id'],
+                        'status': 'posted',
+                        'twitter_tweet_id': result
+                    })
+                else:
+                    # Update to failed
+                    conn.execute(
+                        'UPDATE tweet SET status = ? WHERE id = ?',
+                        ('failed', tweet['id'])
+                    )
+                    results['failed'] += 1
+                    results['details'].append({
+                        'tweet_id': tweet['id'],
+                        'status': 'failed',
+                        'error': result
+                    })
+            
+            conn.commit()
+            
+            return jsonify(results)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -693,74 +828,70 @@ def create_list():
         return jsonify({'error': 'mode must be "private" or "public"'}), 400
     
     try:
-        conn = get_db()
-        
-        # Check if owner account exists and is a list_owner
-        owner = conn.execute(
-            'SELECT id, username, account_type, access_token FROM twitter_account WHERE id = ?',
-            (owner_account_id,)
-        ).fetchone()
-        
-        if not owner:
-            conn.close()
-            return jsonify({'error': 'Owner account not found'}), 404
-        
-        if owner['account_type'] != 'list_owner':
-            conn.close()
-            return jsonify({'error': 'Account must be of type "list_owner" to create lists'}), 400
-        
-        # Create list on Twitter
-        access_token = decrypt_token(owner['access_token'])
-        
-        headers = {
-            'Authorization': f'Bearer {access_token}',
-            'Content-Type': 'application/json'
-        }
-        
-        list_data = {
-            'name': name,
-            'description': description,
-            'private': mode == 'private'
-        }
-        
-        response = requests.post(
-            'https://api.twitter.com/2/lists',
-            headers=headers,
-            json=list_data
-        )
-        
-        if response.status_code != 201:
-            conn.close()
-            return jsonify({
-                'error': 'Failed to create list on Twitter',
-                'details': response.json()
-            }), response.status_code
-        
-        twitter_list = response.json()['data']
-        list_id = twitter_list['id']
-        
-        # Save to database
-        cursor = conn.execute(
-            '''INSERT INTO twitter_list (list_id, name, description, mode, owner_account_id) 
-               VALUES (?, ?, ?, ?, ?)''',
-            (list_id, name, description, mode, owner_account_id)
-        )
-        
-        conn.commit()
-        conn.close()
-        
-        return jsonify({
-            'message': 'List created successfully',
-            'list': {
-                'id': cursor.lastrowid,
-                'list_id': list_id,
+        with closing(get_db()) as conn:
+            # Check if owner account exists and is a list_owner
+            owner = conn.execute(
+                'SELECT id, username, account_type, access_token FROM twitter_account WHERE id = ?',
+                (owner_account_id,)
+            ).fetchone()
+            
+            if not owner:
+                return jsonify({'error': 'Owner account not found'}), 404
+            
+            if owner['account_type'] != 'list_owner':
+                return jsonify({'error': 'Account must be of type "list_owner" to create lists'}), 400
+            
+            # Create list on Twitter
+            access_token = decrypt_token(owner['access_token'])
+            
+            headers = {
+                'Authorization': f'Bearer {access_token}',
+                'Content-Type': 'application/json'
+            }
+            
+            list_data = {
                 'name': name,
                 'description': description,
-                'mode': mode,
-                'owner_account_id': owner_account_id,
-                'owner_username': owner['username']
+                'private': mode == 'private'
             }
-        }), 201
+            
+            response = twitter_session.post(
+                'https://api.twitter.com/2/lists',
+                headers=headers,
+                data=orjson.dumps(list_data),
+                timeout=TWITTER_API_TIMEOUT
+            )
+            
+            if response.status_code != 201:
+                return jsonify({
+                    'error': 'Failed to create list on Twitter',
+                    'details': response.json()
+                }), response.status_code
+            
+            twitter_list = orjson.loads(response.content)['data']
+            list_id = twitter_list['id']
+            
+            # Save to database
+            cursor = conn.execute(
+                '''INSERT INTO twitter_list (list_id, name, description, mode, owner_account_id) 
+                   VALUES (?, ?, ?, ?, ?)''',
+                (list_id, name, description, mode, owner_account_id)
+            )
+            
+            conn.commit()
+            
+            return jsonify({
+                'message': 'List created successfully',
+                'list': {
+                    'id': cursor.lastrowid,
+                    'list_id': list_id,
+                    'name': name,
+                    'description': description,
+                    'mode': mode,
+                    'owner_account_id': owner_account_id,
+                    'owner_username': owner['username']
+                }
+            }), 201
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -774,54 +905,55 @@ def get_lists():
     owner_account_id = request.args.get('owner_account_id')
     
     try:
-        conn = get_db()
-        
-        if owner_account_id:
-            cursor = conn.execute('''
-                SELECT l.*, a.username as owner_username 
-                FROM twitter_list l
-                JOIN twitter_account a ON l.owner_account_id = a.id
-                WHERE l.owner_account_id = ?
-                ORDER BY l.created_at DESC
-            ''', (owner_account_id,))
-        else:
-            cursor = conn.execute('''
-                SELECT l.*, a.username as owner_username 
-                FROM twitter_list l
-                JOIN twitter_account a ON l.owner_account_id = a.id
-                ORDER BY l.created_at DESC
-            ''')
-        
-        lists = cursor.fetchall()
-        
-        # Get member counts
-        result = []
-        for lst in lists:
-            member_count = conn.execute(
-                'SELECT COUNT(*) as count FROM list_membership WHERE list_id = ?',
-                (lst['id'],)
-            ).fetchone()['count']
-            
-            result.append({
-                'id': lst['id'],
-                'list_id': lst['list_id'],
-                'name': lst['name'],
-                'description': lst['description'],
-                'mode': lst['mode'],
-                'owner_account_id': lst['owner_account_id'],
-                'owner_username': lst['owner_username'],
-                'member_count': member_count,
-                'created_at': lst['created_at'],
-                'updated_at': lst['updated_at']
+        with closing(get_db(readonly=True)) as conn:
+            if owner_account_id:
+                cursor = conn.execute('''
+                    SELECT l.*, a.username as owner_username,
+                           COALESCE(m.member_count, 0) as member_count
+                    FROM twitter_list l
+                    JOIN twitter_account a ON l.owner_account_id = a.id
+                    LEFT JOIN (
+                        SELECT list_id, COUNT(*) as member_count
+                        FROM list_membership
+                        GROUP BY list_id
+                    ) m ON m.list_id = l.id
+                    WHERE l.owner_account_id = ?
+                    ORDER BY l.created_at DESC
+                ''', (owner_account_id,))
+            else:
+                cursor = conn.execute('''
+                    SELECT l.*, a.username as owner_username,
+                           COALESCE(m.member_count, 0) as member_count
+                    FROM twitter_list l
+                    JOIN twitter_account a ON l.owner_account_id = a.id
+                    LEFT JOIN (
+                        SELECT list_id, COUNT(*) as member_count
+                        FROM list_membership
+                        GROUP BY list_id
+                    ) m ON m.list_id = l.id
+                    ORDER BY l.created_at DESC
+                ''')
+            
+            result = []
+            for lst in cursor:
+                result.append({
+                    'id': lst['id'],
+                    'list_id': lst['list_id'],
+                    'name': lst['name'],
+                    'description': lst['description'],
+                    'mode': lst['mode'],
+                    'owner_account_id': lst['owner_account_id'],
+                    'owner_username': lst['owner_username'],
+                    'member_count': lst['member_count'],
+                    'created_at': lst['created_at'],
+                    'updated_at': lst['updated_at']
+                })
+            
+            return jsonify({
+                'lists': result,
+                'total': len(result)
             })
         
-        conn.close()
-        
-        return jsonify({
-            'lists': result,
-            'total': len(result)
-        })
-        
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -832,56 +964,52 @@ def get_list(list_id):
         return jsonify({'error': 'Invalid API key'}), 401
     
     try:
-        conn = get_db()
-        
-        # Get list details
-        lst = conn.execute('''
-            SELECT l.*, a.username as owner_username 
-            FROM twitter_list l
-            JOIN twitter_account a ON l.owner_account_id = a.id
-            WHERE l.id = ?
-        ''', (list_id,)).fetchone()
-        
-        if not lst:
-            conn.close()
-            return jsonify({'error': 'List not found'}), 404
-        
-        # Get members
-        members_cursor = conn.execute('''
-            SELECT a.id, a.username, a.status, lm.added_at
-            FROM list_membership lm
-            JOIN twitter_account a ON lm.account_id = a.id
-            WHERE lm.list_id = ?
-            ORDER BY lm.added_at DESC
-        ''', (list_id,))
-        
-        members = []
-        for member in members_cursor:
-            members.append({
-                'id': member['id'],
-                'username': member['username'],
-                'status': member['status'],
-                'added_at': member['added_at']
+        with closing(get_db(readonly=True)) as conn:
+            # Get list details
+            lst = conn.execute('''
+                SELECT l.*, a.username as owner_username 
+                FROM twitter_list l
+                JOIN twitter_account a ON l.owner_account_id = a.id
+                WHERE l.id = ?
+            ''', (list_id,)).fetchone()
+            
+            if not lst:
+                return jsonify({'error': 'List not found'}), 404
+            
+            # Get members
+            members_cursor = conn.execute('''
+                SELECT a.id, a.username, a.status, lm.added_at
+                FROM list_membership lm
+                JOIN twitter_account a ON lm.account_id = a.id
+                WHERE lm.list_id = ?
+                ORDER BY lm.added_at DESC
+            ''', (list_id,))
+            
+            members = []
+            for member in members_cursor:
+                members.append({
+                    'id': member['id'],
+                    'username': member['username'],
+                    'status': member['status'],
+                    'added_at': member['added_at']
+                })
+            
+            return jsonify({
+                'list': {
+                    'id': lst['id'],
+                    'list_id': lst['list_id'],
+                    'name': lst['name'],
+                    'description': lst['description'],
+                    'mode': lst['mode'],
+                    'owner_account_id': lst['owner_account_id'],
+                    'owner_username': lst['owner_username'],
+                    'created_at': lst['created_at'],
+                    'updated_at': lst['updated_at']
+                },
+                'members': members,
+                'member_count': len(members)
             })
         
-        conn.close()
-        
-        return jsonify({
-            'list': {
-                'id': lst['id'],
-                'list_id': lst['list_id'],
-                'name': lst['name'],
-                'description': lst['description'],
-                'mode': lst['mode'],
-                'owner_account_id': lst['owner_account_id'],
-                'owner_username': lst['owner_username'],
-                'created_at': lst['created_at'],
-                'updated_at': lst['updated_at']
-            },
-            'members': members,
-            'member_count': len(members)
-        })
-        
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -896,66 +1024,63 @@ def update_list(list_id):
         return jsonify({'error': 'No data provided'}), 400
     
     try:
-        conn = get_db()
-        
-        # Get list and owner details
-        lst = conn.execute('''
-            SELECT l.*, a.access_token 
-            FROM twitter_list l
-            JOIN twitter_account a ON l.owner_account_id = a.id
-            WHERE l.id = ?
-        ''', (list_id,)).fetchone()
-        
-        if not lst:
-            conn.close()
-            return jsonify({'error': 'List not found'}), 404
-        
-        # Update on Twitter
-        access_token = decrypt_token(lst['access_token'])
-        headers = {
-            'Authorization': f'Bearer {access_token}',
-            'Content-Type': 'application/json'
-        }
-        
-        update_data = {}
-        if 'name' in data:
-            update_data['name'] = data['name']
-        if 'description' in data:
-            update_data['description'] = data['description']
-        
-        if update_data:
-            response = requests.put(
-                f'https://api.twitter.com/2/lists/{lst["list_id"]}',
-                headers=headers,
-                json=update_data
-            )
+        with closing(get_db()) as conn:
+            # Get list and owner details
+            lst = conn.execute('''
+                SELECT l.list_id, a.access_token 
+                FROM twitter_list l
+                JOIN twitter_account a ON l.owner_account_id = a.id
+                WHERE l.id = ?
+            ''', (list_id,)).fetchone()
             
-            if response.status_code != 200:
-                conn.close()
-                return jsonify({
-                    'error': 'Failed to update list on Twitter',
-                    'details': response.json()
-                }), response.status_code
-        
-        # Update in database
-        if 'name' in data:
-            conn.execute(
-                'UPDATE twitter_list SET name = ?, updated_at = ? WHERE id = ?',
-                (data['name'], datetime.utcnow().isoformat(), list_id)
-            )
-        if 'description' in data:
-            conn.execute(
-                'UPDATE twitter_list SET description = ?, updated_at = ? WHERE id = ?',
-                (data['description'], datetime.utcnow().isoformat(), list_id)
-            )
-        
-        conn.commit()
-        conn.close()
-        
-        return jsonify({
-            'message': 'List updated successfully',
-            'list_id': list_id
-        })
+            if not lst:
+                return jsonify({'error': 'List not found'}), 404
+            
+            # Update on Twitter
+            access_token = decrypt_token(lst['access_token'])
+            headers = {
+                'Authorization': f'Bearer {access_token}',
+                'Content-Type': 'application/json'
+            }
+            
+            update_data = {}
+            if 'name' in data:
+                update_data['name'] = data['name']
+            if 'description' in data:
+                update_data['description'] = data['description']
+            
+            if update_data:
+                response = twitter_session.put(
+                    f'https://api.twitter.com/2/lists/{lst["list_id"]}',
+                    headers=headers,
+                    data=orjson.dumps(update_data),
+                    timeout=TWITTER_API_TIMEOUT
+                )
+                
+                if response.status_code != 200:
+                    return jsonify({
+                        'error': 'Failed to update list on Twitter',
+                        'details': response.json()
+                    }), response.status_code
+            
+            # Update in database
+            if 'name' in data:
+                conn.execute(
+                    'UPDATE twitter_list SET name = ?, updated_at = ? WHERE id = ?',
+                    (data['name'], request_ts(), list_id)
+                )
+            if 'description' in data:
+                conn.execute(
+                    'UPDATE twitter_list SET description = ?, updated_at = ? WHERE id = ?',
+                    (data['description'], request_ts(), list_id)
+                )
+            
+            conn.commit()
+            
+            return jsonify({
+                'message': 'List updated successfully',
+                'list_id': list_id
+            })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -967,48 +1092,45 @@ def delete_list(list_id):
         return jsonify({'error': 'Invalid API key'}), 401
     
     try:
-        conn = get_db()
-        
-        # Get list and owner details
-        lst = conn.execute('''
-            SELECT l.*, a.access_token, a.username 
-            FROM twitter_list l
-            JOIN twitter_account a ON l.owner_account_id = a.id
-            WHERE l.id = ?
-        ''', (list_id,)).fetchone()
-        
-        if not lst:
-            conn.close()
-            return jsonify({'error': 'List not found'}), 404
-        
-        # Delete from Twitter
-        access_token = decrypt_token(lst['access_token'])
-        headers = {
-            'Authorization': f'Bearer {access_token}'
-        }
-        
-        response = requests.delete(
-            f'https://api.twitter.com/2/lists/{lst["list_id"]}',
-            headers=headers
-        )
-        
-        if response.status_code != 200:
-            conn.close()
+        with closing(get_db()) as conn:
+            # Get list and owner details
+            lst = conn.execute('''
+                SELECT l.list_id, l.name, a.access_token, a.username 
+                FROM twitter_list l
+                JOIN twitter_account a ON l.owner_account_id = a.id
+                WHERE l.id = ?
+            ''', (list_id,)).fetchone()
+            
+            if not lst:
+                return jsonify({'error': 'List not found'}), 404
+            
+            # Delete from Twitter
+            access_token = decrypt_token(lst['access_token'])
+            headers = {
+                'Authorization': f'Bearer {access_token}'
+            }
+            
+            response = twitter_session.delete(
+                f'https://api.twitter.com/2/lists/{lst["list_id"]}',
+                headers=headers,
+                timeout=TWITTER_API_TIMEOUT
+            )
+            
+            if response.status_code != 200:
+                return jsonify({
+                    'error': 'Failed to delete list on Twitter',
+                    'details': response.json()
+                }), response.status_code
+            
+            # Delete from database (cascade will delete memberships)
+            conn.execute('DELETE FROM twitter_list WHERE id = ?', (list_id,))
+            conn.commit()
+            
             return jsonify({
-                'error': 'Failed to delete list on Twitter',
-                'details': response.json()
-            }), response.status_code
-        
-        # Delete from database (cascade will delete memberships)
-        conn.execute('DELETE FROM twitter_list WHERE id = ?', (list_id,))
-        conn.commit()
-        conn.close()
-        
-        return jsonify({
-            'message': 'List deleted successfully',
-            'list_name': lst['name'],
-            'owner_username': lst['username']
-        })
+                'message': 'List deleted successfully',
+                'list_name': lst['name'],
+                'owner_username': lst['username']
+            })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1029,107 +1151,129 @@ def add_list_members(list_id):
         return jsonify({'error': 'account_ids must be an array'}), 400
     
     try:
-        conn = get_db()
-        
-        # Get list and owner details
-        lst = conn.execute('''
-            SELECT l.*, a.access_token 
-            FROM twitter_list l
-            JOIN twitter_account a ON l.owner_account_id = a.id
-            WHERE l.id = ?
-        ''', (list_id,)).fetchone()
-        
-        if not lst:
-            conn.close()
-            return jsonify({'error': 'List not found'}), 404
-        
-        access_token = decrypt_token(lst['access_token'])
-        headers = {
-            'Authorization': f'Bearer {access_token}',
-            'Content-Type': 'application/json'
-        }
-        
-        added = []
-        failed = []
-        
-        for account_id in account_ids:
-            # Get account details
-            account = conn.execute(
-                'SELECT id, username FROM twitter_account WHERE id = ?',
-                (account_id,)
-            ).fetchone()
+        with closing(get_db()) as conn:
+            # Get list and owner details
+            lst = conn.execute('''
+                SELECT l.list_id, l.name, a.access_token 
+                FROM twitter_list l
+                JOIN twitter_account a ON l.owner_account_id = a.id
+                WHERE l.id = ?
+            ''', (list_id,)).fetchone()
             
-            if not account:
-                failed.append({
-                    'account_id': account_id,
-                    'error': 'Account not found'
-                })
-                continue
+            if not lst:
+                return jsonify({'error': 'List not found'}), 404
             
-            # Check if already member
-            existing = conn.execute(
-                'SELECT id FROM list_membership WHERE list_id = ? AND account_id = ?',
-                (list_id, account_id)
-            ).fetchone()
+            access_token = decrypt_token(lst['access_token'])
+            headers = {
+                'Authorization': f'Bearer {access_token}',
+                'Content-Type': 'application/json'
+            }
             
-            if existing:
-                failed.append({
-                    'account_id': account_id,
-                    'username': account['username'],
-                    'error': 'Already a member'
-                })
-                continue
+            added = []
+            failed = []
+            candidates = []
+            seen = set()
+            new_memberships = []
             
-            # Get Twitter user ID
-            user_response = requests.get(
-                f'https://api.twitter.com/2/users/by/username/{account["username"]}',
-                headers={'Authorization': f'Bearer {access_token}'}
-            )
+            for account_id in account_ids:
+                # Get account details
+                account = conn.execute(
+                    'SELECT id, username, twitter_user_id FROM twitter_account WHERE id = ?',
+                    (account_id,)
+                ).fetchone()
+                
+                if not account:
+                    failed.append({
+                        'account_id': account_id,
+                        'error': 'Account not found'
+                    })
+                    continue
+                
+                # Check if already member (or repeated earlier in this request)
+                existing = account['id'] in seen or conn.execute(
+                    'SELECT id FROM list_membership WHERE list_id = ? AND account_id = ?',
+                    (list_id, account_id)
+                ).fetchone()
+                
+                if existing:
+                    failed.append({
+                        'account_id': account_id,
+                        'username': account['username'],
+                        'error': 'Already a member'
+                    })
+                    continue
+                
+                seen.add(account['id'])
+                candidates.append(account)
             
-            if user_response.status_code != 200:
-                failed.append({
-                    'account_id': account_id,
-                    'username': account['username'],
-                    'error': 'Failed to get Twitter user ID'
-                })
-                continue
+            # Resolve Twitter user IDs not stored yet concurrently - each lookup is a network round-trip
+            looked_up_ids = {}
+            missing = [account for account in candidates if not account['twitter_user_id']]
+            if missing:
+                with ThreadPoolExecutor(max_workers=min(8, len(missing))) as executor:
+                    lookups = executor.map(
+                        lambda account: get_twitter_user_id(account['username'], access_token),
+                        missing
+                    )
+                    for account, twitter_user_id in zip(missing, lookups):
+                        looked_up_ids[account['id']] = twitter_user_id
             
-            twitter_user_id = user_response.json()['data']['id']
+            for account in candidates:
+                account_id = account['id']
+                twitter_user_id = account['twitter_user_id'] or looked_up_ids.get(account_id)
+                
+                if not twitter_user_id:
+                    failed.append({
+                        'account_id': account_id,
+                        'username': account['username'],
+                        'error': 'Failed to get Twitter user ID'
+                    })
+                    continue
+                
+                if not account['twitter_user_id']:
+                    # Remember the ID so later requests skip the lookup
+                    conn.execute(
+                        'UPDATE twitter_account SET twitter_user_id = ? WHERE id = ?',
+                        (twitter_user_id, account_id)
+                    )
+                
+                # Add to list on Twitter
+                add_response = twitter_session.post(
+                    f'https://api.twitter.com/2/lists/{lst["list_id"]}/members',
+                    headers=headers,
+                    data=orjson.dumps({'user_id': twitter_user_id}),
+                    timeout=TWITTER_API_TIMEOUT
+                )
+                
+                if add_response.status_code == 200:
+                    new_memberships.append((list_id, account_id))
+                    added.append({
+                        'account_id': account_id,
+                        'username': account['username']
+                    })
+                else:
+                    failed.append({
+                        'account_id': account_id,
+                        'username': account['username'],
+                        'error': add_response.json().get('detail', 'Failed to add to Twitter list')
+                    })
             
-            # Add to list on Twitter
-            add_response = requests.post(
-                f'https://api.twitter.com/2/lists/{lst["list_id"]}/members',
-                headers=headers,
-                json={'user_id': twitter_user_id}
+            # Add to database in one batch; repeats within the request are already filtered out,
+            # OR IGNORE only covers a concurrent request adding the same member first
+            conn.executemany(
+                'INSERT OR IGNORE INTO list_membership (list_id, account_id) VALUES (?, ?)',
+                new_memberships
             )
             
-            if add_response.status_code == 200:
-                # Add to database
-                conn.execute(
-                    'INSERT INTO list_membership (list_id, account_id) VALUES (?, ?)',
-                    (list_id, account_id)
-                )
-                added.append({
-                    'account_id': account_id,
-                    'username': account['username']
-                })
-            else:
-                failed.append({
-                    'account_id': account_id,
-                    'username': account['username'],
-                    'error': add_response.json().get('detail', 'Failed to add to Twitter list')
-                })
-        
-        conn.commit()
-        conn.close()
-        
-        return jsonify({
-            'message': f'Processed {len(account_ids)} accounts',
-            'added': added,
-            'failed': failed,
-            'added_count': len(added),
-            'failed_count': len(failed)
-        })
+            conn.commit()
+            
+            return jsonify({
+                'message': f'Processed {len(account_ids)} accounts',
+                'added': added,
+                'failed': failed,
+                'added_count': len(added),
+                'failed_count': len(failed)
+            })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1141,46 +1285,42 @@ def get_list_members(list_id):
         return jsonify({'error': 'Invalid API key'}), 401
     
     try:
-        conn = get_db()
-        
-        # Check if list exists
-        lst = conn.execute(
-            'SELECT id, name FROM twitter_list WHERE id = ?',
-            (list_id,)
-        ).fetchone()
-        
-        if not lst:
-            conn.close()
-            return jsonify({'error': 'List not found'}), 404
-        
-        # Get members
-        cursor = conn.execute('''
-            SELECT a.id, a.username, a.status, a.account_type, lm.added_at
-            FROM list_membership lm
-            JOIN twitter_account a ON lm.account_id = a.id
-            WHERE lm.list_id = ?
-            ORDER BY lm.added_at DESC
-        ''', (list_id,))
-        
-        members = []
-        for member in cursor:
-            members.append({
-                'id': member['id'],
-                'username': member['username'],
-                'status': member['status'],
-                'account_type': member['account_type'] if 'account_type' in member.keys() else 'managed',
-                'added_at': member['added_at']
+        with closing(get_db(readonly=True)) as conn:
+            # Check if list exists
+            lst = conn.execute(
+                'SELECT id, name FROM twitter_list WHERE id = ?',
+                (list_id,)
+            ).fetchone()
+            
+            if not lst:
+                return jsonify({'error': 'List not found'}), 404
+            
+            # Get members
+            cursor = conn.execute('''
+                SELECT a.id, a.username, a.status, COALESCE(a.account_type, 'managed') as account_type, lm.added_at
+                FROM list_membership lm
+                JOIN twitter_account a ON lm.account_id = a.id
+                WHERE lm.list_id = ?
+                ORDER BY lm.added_at DESC
+            ''', (list_id,))
+            
+            members = []
+            for member in cursor:
+                members.append({
+                    'id': member['id'],
+                    'username': member['username'],
+                    'status': member['status'],
+                    'account_type': member['account_type'],
+                    'added_at': member['added_at']
+                })
+            
+            return jsonify({
+                'list_id': list_id,
+                'list_name': lst['name'],
+                'members': members,
+                'total': len(members)
             })
         
-        conn.close()
-        
-        return jsonify({
-            'list_id': list_id,
-            'list_name': lst['name'],
-            'members': members,
-            'total': len(members)
-        })
-        
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -1191,79 +1331,69 @@ def remove_list_member(list_id, account_id):
         return jsonify({'error': 'Invalid API key'}), 401
     
     try:
-        conn = get_db()
-        
-        # Get list and owner details
-        lst = conn.execute('''
-            SELECT l.*, a.access_token 
-            FROM twitter_list l
-            JOIN twitter_account a ON l.owner_account_id = a.id
-            WHERE l.id = ?
-        ''', (list_id,)).fetchone()
-        
-        if not lst:
-            conn.close()
-            return jsonify({'error': 'List not found'}), 404
-        
-        # Get account details
-        account = conn.execute(
-            'SELECT id, username FROM twitter_account WHERE id = ?',
-            (account_id,)
-        ).fetchone()
-        
-        if not account:
-            conn.close()
-            return jsonify({'error': 'Account not found'}), 404
-        
-        # Check membership
-        membership = conn.execute(
-            'SELECT id FROM list_membership WHERE list_id = ? AND account_id = ?',
-            (list_id, account_id)
-        ).fetchone()
-        
-        if not membership:
-            conn.close()
-            return jsonify({'error': 'Account is not a member of this list'}), 404
-        
-        access_token = decrypt_token(lst['access_token'])
-        
-        # Get Twitter user ID
-        user_response = requests.get(
-            f'https://api.twitter.com/2/users/by/username/{account["username"]}',
-            headers={'Authorization': f'Bearer {access_token}'}
-        )
-        
-        if user_response.status_code == 200:
-            twitter_user_id = user_response.json()['data']['id']
+        with closing(get_db()) as conn:
+            # Get list and owner details
+            lst = conn.execute('''
+                SELECT l.list_id, a.access_token 
+                FROM twitter_list l
+                JOIN twitter_account a ON l.owner_account_id = a.id
+                WHERE l.id = ?
+            ''', (list_id,)).fetchone()
+            
+            if not lst:
+                return jsonify({'error': 'List not found'}), 404
+            
+            # Get account details
+            account = conn.execute(
+                'SELECT id, username, twitter_user_id FROM twitter_account WHERE id = ?',
+                (account_id,)
+            ).fetchone()
+            
+            if not account:
+                return jsonify({'error': 'Account not found'}), 404
+            
+            # Check membership
+            membership = conn.execute(
+                'SELECT id FROM list_membership WHERE list_id = ? AND account_id = ?',
+                (list_id, account_id)
+            ).fetchone()
+            
+            if not membership:
+                return jsonify({'error': 'Account is not a member of this list'}), 404
             
-            # Remove from Twitter list
-            remove_response = requests.delete(
-                f'https://api.twitter.com/2/lists/{lst["list_id"]}/members/{twitter_user_id}',
-                headers={'Authorization': f'Bearer {access_token}'}
+            access_token = decrypt_token(lst['access_token'])
+            
+            # Get Twitter user ID
+            twitter_user_id = account['twitter_user_id'] or get_twitter_user_id(account['username'], access_token)
+            
+            if twitter_user_id:
+                # Remove from Twitter list
+                remove_response = twitter_session.delete(
+                    f'https://api.twitter.com/2/lists/{lst["list_id"]}/members/{twitter_user_id}',
+                    headers={'Authorization': f'Bearer {access_token}'},
+                    timeout=TWITTER_API_TIMEOUT
+                )
+                
+                if remove_response.status_code != 200:
+                    return jsonify({
+                        'error': 'Failed to remove from Twitter list',
+                        'details': remove_response.json()
+                    }), remove_response.status_code
+            
+            # Remove from database
+            conn.execute(
+                'DELETE FROM list_membership WHERE list_id = ? AND account_id = ?',
+                (list_id, account_id)
             )
             
-            if remove_response.status_code != 200:
-                conn.close()
-                return jsonify({
-                    'error': 'Failed to remove from Twitter list',
-                    'details': remove_response.json()
-                }), remove_response.status_code
-        
-        # Remove from database
-        conn.execute(
-            'DELETE FROM list_membership WHERE list_id = ? AND account_id = ?',
-            (list_id, account_id)
-        )
-        
-        conn.commit()
-        conn.close()
-        
-        return jsonify({
-            'message': 'Account removed from list successfully',
-            'list_id': list_id,
-            'account_id': account_id,
-            'username': account['username']
-        })
+            conn.commit()
+            
+            return jsonify({
+                'message': 'Account removed from list successfully',
+                'list_id': list_id,
+                'account_id': account_id,
+                'username': account['username']
+            })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1277,37 +1407,34 @@ def delete_account(account_id):
         return jsonify({'error': 'Invalid API key'}), 401
     
     try:
-        conn = get_db()
-        
-        # Check if account exists
-        account = conn.execute(
-            'SELECT username FROM twitter_account WHERE id = ?',
-            (account_id,)
-        ).fetchone()
-        
-        if not account:
-            conn.close()
-            return jsonify({'error': 'Account not found'}), 404
-        
-        # Delete associated tweets first
-        deleted_tweets = conn.execute(
-            'DELETE FROM tweet WHERE twitter_account_id = ?',
-            (account_id,)
-        ).rowcount
-        
-        # Delete the account
-        conn.execute(
-            'DELETE FROM twitter_account WHERE id = ?',
-            (account_id,)
-        )
-        
-        conn.commit()
-        conn.close()
-        
-        return jsonify({
-            'message': f'Account @{account["username"]} deleted successfully',
-            'deleted_tweets': deleted_tweets
-        })
+        with closing(get_db()) as conn:
+            # Check if account exists
+            account = conn.execute(
+                'SELECT username FROM twitter_account WHERE id = ?',
+                (account_id,)
+            ).fetchone()
+            
+            if not account:
+                return jsonify({'error': 'Account not found'}), 404
+            
+            # Delete associated tweets first
+            deleted_tweets = conn.execute(
+                'DELETE FROM tweet WHERE twitter_account_id = ?',
+                (account_id,)
+            ).rowcount
+            
+            # Delete the account
+            conn.execute(
+                'DELETE FROM twitter_account WHERE id = ?',
+                (account_id,)
+            )
+            
+            conn.commit()
+            
+            return jsonify({
+                'message': f'Account @{account["username"]} deleted successfully',
+                'deleted_tweets': deleted_tweets
+            })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1323,48 +1450,50 @@ def cleanup_inactive_accounts():
     statuses_to_delete = data.get('statuses', ['failed', 'suspended', 'inactive'])
     
     try:
-        conn = get_db()
-        
-        # Get accounts to delete
-        placeholders = ','.join('?' * len(statuses_to_delete))
-        accounts = conn.execute(
-            f'SELECT id, username, status FROM twitter_account WHERE status IN ({placeholders})',
-            statuses_to_delete
-        ).fetchall()
-        
-        results = {
-            'deleted_accounts': [],
-            'deleted_tweets_total': 0
-        }
-        
-        for account in accounts:
-            # Delete tweets for this account
-            deleted_tweets = conn.execute(
-                'DELETE FROM tweet WHERE twitter_account_id = ?',
-                (account['id'],)
-            ).rowcount
+        with closing(get_db()) as conn:
+            # Take the write lock first so the counts below match what gets deleted
+            conn.execute('BEGIN IMMEDIATE')
             
-            # Delete the account
+            # Get accounts to delete, with their tweet counts aggregated in SQL
+            placeholders = ','.join('?' * len(statuses_to_delete))
+            accounts = conn.execute(f'''
+                SELECT a.id, a.username, a.status, COUNT(t.id) as tweet_count
+                FROM twitter_account a
+                LEFT JOIN tweet t ON t.twitter_account_id = a.id
+                WHERE a.status IN ({placeholders})
+                GROUP BY a.id
+            ''', statuses_to_delete).fetchall()
+            
+            # Delete their tweets, then the accounts, as two set-based statements
+            # (the write lock held since the SELECT means these match exactly the accounts above)
+            deleted_tweets_total = conn.execute(
+                f'DELETE FROM tweet WHERE twitter_account_id IN (SELECT id FROM twitter_account WHERE status IN ({placeholders}))',
+                statuses_to_delete
+            ).rowcount
             conn.execute(
-                'DELETE FROM twitter_account WHERE id = ?',
-                (account['id'],)
+                f'DELETE FROM twitter_account WHERE status IN ({placeholders})',
+                statuses_to_delete
             )
             
-            results['deleted_accounts'].append({
-                'id': account['id'],
-                'username': account['username'],
-                'status': account['status'],
-                'deleted_tweets': deleted_tweets
+            results = {
+                'deleted_accounts': [],
+                'deleted_tweets_total': deleted_tweets_total
+            }
+            
+            for account in accounts:
+                results['deleted_accounts'].append({
+                    'id': account['id'],
+                    'username': account['username'],
+                    'status': account['status'],
+                    'deleted_tweets': account['tweet_count']
+                })
+            
+            conn.commit()
+            
+            return jsonify({
+                'message': f'Cleaned up {len(accounts)} inactive accounts',
+                'results': results
             })
-            results['deleted_tweets_total'] += deleted_tweets
-        
-        conn.commit()
-        conn.close()
-        
-        return jsonify({
-            'message': f'Cleaned up {len(accounts)} inactive accounts',
-            'results': results
-        })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1384,43 +1513,41 @@ def cleanup_tweets():
         return jsonify({'error': 'Provide either statuses or days_old parameter'}), 400
     
     try:
-        conn = get_db()
-        
-        # Build query
-        query = 'DELETE FROM tweet WHERE 1=1'
-        params = []
-        
-        if statuses:
-            placeholders = ','.join('?' * len(statuses))
-            query += f' AND status IN ({placeholders})'
-            params.extend(statuses)
-        
-        if days_old:
-            cutoff_date = (datetime.utcnow() - timedelta(days=days_old)).isoformat()
-            query += ' AND created_at < ?'
-            params.append(cutoff_date)
-        
-        if account_id:
-            query += ' AND twitter_account_id = ?'
-            params.append(account_id)
-        
-        # Get count before deletion for reporting
-        count_query = query.replace('DELETE FROM', 'SELECT COUNT(*) FROM')
-        count = conn.execute(count_query, params).fetchone()[0]
-        
-        # Execute deletion
-        conn.execute(query, params)
-        conn.commit()
-        conn.close()
-        
-        return jsonify({
-            'message': f'Deleted {count} tweets',
-            'criteria': {
-                'statuses': statuses,
-                'days_old': days_old,
-                'account_id': account_id
-            }
-        })
+        with closing(get_db()) as conn:
+            # Build query
+            query = 'DELETE FROM tweet WHERE 1=1'
+            params = []
+            
+            if statuses:
+                placeholders = ','.join('?' * len(statuses))
+                query += f' AND status IN ({placeholders})'
+                params.extend(statuses)
+            
+            if days_old:
+                cutoff_date = (datetime.utcnow() - timedelta(days=days_old)).isoformat()
+                query += ' AND created_at < ?'
+                params.append(cutoff_date)
+            
+            if account_id:
+                query += ' AND twitter_account_id = ?'
+                params.append(account_id)
+            
+            # Get count before deletion for reporting
+            count_query = query.replace('DELETE FROM', 'SELECT COUNT(*) FROM')
+            count = conn.execute(count_query, params).fetchone()[0]
+            
+            # Execute deletion
+            conn.execute(query, params)
+            conn.commit()
+            
+            return jsonify({
+                'message': f'Deleted {count} tweets',
+                'criteria': {
+                    'statuses': statuses,
+                    'days_old': days_old,
+                    'account_id': account_id
+                }
+            })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1432,31 +1559,28 @@ def delete_tweet(tweet_id):
         return jsonify({'error': 'Invalid API key'}), 401
     
     try:
-        conn = get_db()
-        
-        # Check if tweet exists
-        tweet = conn.execute(
-            'SELECT id, content, status FROM tweet WHERE id = ?',
-            (tweet_id,)
-        ).fetchone()
-        
-        if not tweet:
-            conn.close()
-            return jsonify({'error': 'Tweet not found'}), 404
-        
-        # Delete the tweet
-        conn.execute('DELETE FROM tweet WHERE id = ?', (tweet_id,))
-        conn.commit()
-        conn.close()
-        
-        return jsonify({
-            'message': 'Tweet deleted successfully',
-            'tweet': {
-                'id': tweet['id'],
-                'content': tweet['content'][:50] + '...' if len(tweet['content']) > 50 else tweet['content'],
-                'status': tweet['status']
-            }
-        })
+        with closing(get_db()) as conn:
+            # Check if tweet exists
+            tweet = conn.execute(
+                'SELECT id, content, status FROM tweet WHERE id = ?',
+                (tweet_id,)
+            ).fetchone()
+            
+            if not tweet:
+                return jsonify({'error': 'Tweet not found'}), 404
+            
+            # Delete the tweet
+            conn.execute('DELETE FROM tweet WHERE id = ?', (tweet_id,))
+            conn.commit()
+            
+            return jsonify({
+                'message': 'Tweet deleted successfully',
+                'tweet': {
+                    'id': tweet['id'],
+                    'content': _preview(tweet['content']),
+                    'status': tweet['status']
+                }
+            })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1477,98 +1601,90 @@ def auth_callback_redirect():
         return "<h1>Invalid OAuth callback</h1><p>Missing code or state parameter</p>", 400
     
     # Process the OAuth callback directly here
-    conn = get_db()
-    
-    # Retrieve code_verifier from database
-    oauth_data = conn.execute(
-        'SELECT code_verifier FROM oauth_state WHERE state = ?',
-        (state,)
-    ).fetchone()
-    
-    if not oauth_data:
-        conn.close()
-        return "<h1>Invalid state</h1><p>The authorization state is invalid or expired. Please start the OAuth flow again.</p>", 400
-    
-    code_verifier = oauth_data['code_verifier']
-    
-    # Exchange code for tokens
-    token_url = 'https://api.twitter.com/2/oauth2/token'
-    
-    auth_string = f"{TWITTER_CLIENT_ID}:{TWITTER_CLIENT_SECRET}"
-    auth_bytes = auth_string.encode('ascii')
-    auth_b64 = base64.b64encode(auth_bytes).decode('ascii')
-    
-    headers = {
-        'Authorization': f'Basic {auth_b64}',
-        'Content-Type': 'application/x-www-form-urlencoded'
-    }
-    
-    data = {
-        'code': code,
-        'grant_type': 'authorization_code',
-        'client_id': TWITTER_CLIENT_ID,
-        'redirect_uri': TWITTER_CALLBACK_URL,
-        'code_verifier': code_verifier
-    }
-    
-    response = requests.post(token_url, headers=headers, data=data)
-    
-    if response.status_code != 200:
-        conn.close()
-        return f"<h1>Token Exchange Failed</h1><p>Status: {response.status_code}</p><pre>{response.text}</pre>", 400
-    
-    tokens = response.json()
-    access_token = tokens['access_token']
-    refresh_token = tokens.get('refresh_token')
-    
-    # Get user info
-    user_response = requests.get(
-        'https://api.twitter.com/2/users/me',
-        headers={'Authorization': f'Bearer {access_token}'}
-    )
-    
-    if user_response.status_code != 200:
-        conn.close()
-        return f"<h1>Failed to get user info</h1><p>Status: {user_response.status_code}</p><pre>{user_response.text}</pre>", 400
-    
-    user_data = user_response.json()['data']
-    username = user_data['username']
-    
-    # Encrypt tokens
-    encrypted_access_token = fernet.encrypt(access_token.encode()).decode()
-    encrypted_refresh_token = fernet.encrypt(refresh_token.encode()).decode() if refresh_token else None
-    
-    # Check if account exists
-    existing = conn.execute(
-        'SELECT id FROM twitter_account WHERE username = ?',
-        (username,)
-    ).fetchone()
-    
-    if existing:
-        # Update existing account
-        conn.execute(
-            'UPDATE twitter_account SET access_token = ?, refresh_token = ?, status = ?, updated_at = ? WHERE username = ?',
-            (encrypted_access_token, encrypted_refresh_token, 'active', datetime.utcnow().isoformat(), username)
-        )
-        account_id = existing['id']
-        message = f"Account @{username} has been re-authorized successfully!"
-    else:
-        # Create new account
-        cursor = conn.execute(
-            'INSERT INTO twitter_account (username, access_token, access_token_secret, refresh_token, status, created_at) VALUES (?, ?, ?, ?, ?, ?)',
-            (username, encrypted_access_token, None, encrypted_refresh_token, 'active', datetime.utcnow().isoformat())
+    with closing(get_db()) as conn:
+        # Retrieve code_verifier from database
+        oauth_data = conn.execute(
+            'SELECT code_verifier FROM oauth_state WHERE state = ?',
+            (state,)
+        ).fetchone()
+        
+        if not oauth_data:
+            return "<h1>Invalid state</h1><p>The authorization state is invalid or expired. Please start the OAuth flow again.</p>", 400
+        
+        code_verifier = oauth_data['code_verifier']
+        
+        # Exchange code for tokens
+        token_url = 'https://api.twitter.com/2/oauth2/token'
+        
+        headers = {
+            'Authorization': TWITTER_BASIC_AUTH,
+            'Content-Type': 'application/x-www-form-urlencoded'
+        }
+        
+        data = {
+            'code': code,
+            'grant_type': 'authorization_code',
+            'client_id': TWITTER_CLIENT_ID,
+            'redirect_uri': TWITTER_CALLBACK_URL,
+            'code_verifier': code_verifier
+        }
+        
+        response = twitter_session.post(token_url, headers=headers, data=data, timeout=TWITTER_API_TIMEOUT)
+        
+        if response.status_code != 200:
+            return f"<h1>Token Exchange Failed</h1><p>Status: {response.status_code}</p><pre>{response.text}</pre>", 400
+        
+        tokens = orjson.loads(response.content)
+        access_token = tokens['access_token']
+        refresh_token = tokens.get('refresh_token')
+        
+        # Get user info
+        user_response = twitter_session.get(
+            'https://api.twitter.com/2/users/me',
+            headers={'Authorization': f'Bearer {access_token}'},
+            timeout=TWITTER_API_TIMEOUT
         )
-        account_id = cursor.lastrowid
-        message = f"Account @{username} has been authorized successfully!"
-    
-    # Clean up oauth_state
-    conn.execute('DELETE FROM oauth_state WHERE state = ?', (state,))
-    
-    conn.commit()
-    conn.close()
-    
-    # Return success HTML page
-    return f'''<!DOCTYPE html>
+        
+        if user_response.status_code != 200:
+            return f"<h1>Failed to get user info</h1><p>Status: {user_response.status_code}</p><pre>{user_response.text}</pre>", 400
+        
+        user_data = orjson.loads(user_response.content)['data']
+        username = user_data['username']
+        
+        # Encrypt tokens
+        encrypted_access_token = encrypt_token(access_token)
+        encrypted_refresh_token = encrypt_token(refresh_token)
+        
+        # Check if account exists
+        existing = conn.execute(
+            'SELECT id FROM twitter_account WHERE username = ?',
+            (username,)
+        ).fetchone()
+        
+        if existing:
+            # Update existing account
+            conn.execute(
+                'UPDATE twitter_account SET access_token = ?, refresh_token = ?, twitter_user_id = ?, status = ?, updated_at = ? WHERE username = ?',
+                (encrypted_access_token, encrypted_refresh_token, user_data['id'], 'active', request_ts(), username)
+            )
+            account_id = existing['id']
+            message = f"Account @{username} has been re-authorized successfully!"
+        else:
+            # Create new account
+            cursor = conn.execute(
+                'INSERT INTO twitter_account (username, twitter_user_id, access_token, access_token_secret, refresh_token, status, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (username, user_data['id'], encrypted_access_token, None, encrypted_refresh_token, 'active', request_ts())
+            )
+            account_id = cursor.lastrowid
+            message = f"Account @{username} has been authorized successfully!"
+        
+        # Clean up oauth_state
+        conn.execute('DELETE FROM oauth_state WHERE state = ?', (state,))
+        
+        conn.commit()
+        
+        # Return success HTML page
+        return f'''<!DOCTYPE html>
 <html>
 <head>
     <title>Authorization Successful</title>
@@ -1646,127 +1762,138 @@ def auth_callback_redirect():
 def init_database():
     """Initialize database tables"""
     try:
-        conn = get_db()
-        
-        # Create api_key table
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS api_key (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                key_hash TEXT UNIQUE NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                is_active BOOLEAN DEFAULT 1
-            )
-        ''')
-        
-        # Create twitter_account table
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS twitter_account (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                access_token TEXT NOT NULL,
-                access_token_secret TEXT,
-                refresh_token TEXT,
-                status TEXT DEFAULT 'active',
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                updated_at DATETIME
-            )
-        ''')
-        
-        # Create tweet table
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS tweet (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                twitter_account_id INTEGER NOT NULL,
-                content TEXT NOT NULL,
-                status TEXT DEFAULT 'pending',
-                twitter_id TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                posted_at DATETIME,
-                FOREIGN KEY (twitter_account_id) REFERENCES twitter_account (id)
-            )
-        ''')
-        
-        # Create oauth_state table if it doesn't exist
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS oauth_state (
-                state TEXT PRIMARY KEY,
-                code_verifier TEXT NOT NULL,
-                created_at DATETIME NOT NULL
-            )
-        ''')
-        
-        # Add refresh_token column to twitter_account if it doesn't exist
-        try:
-            conn.execute('ALTER TABLE twitter_account ADD COLUMN refresh_token TEXT')
-            print("Added refresh_token column to twitter_account table")
-        except:
-            pass  # Column already exists
-        
-        # Add updated_at column if it doesn't exist
-        try:
-            conn.execute('ALTER TABLE twitter_account ADD COLUMN updated_at DATETIME')
-            print("Added updated_at column to twitter_account table")
-        except:
-            pass  # Column already exists
-        
-        # Add account_type column to twitter_account if it doesn't exist
-        try:
-            conn.execute("ALTER TABLE twitter_account ADD COLUMN account_type TEXT DEFAULT 'managed'")
-            print("Added account_type column to twitter_account table")
-        except:
-            pass  # Column already exists
-        
-        # Create twitter_list table
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS twitter_list (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                list_id TEXT UNIQUE NOT NULL,
-                name TEXT NOT NULL,
-                description TEXT,
-                mode TEXT DEFAULT 'private',
-                owner_account_id INTEGER NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                updated_at DATETIME,
-                FOREIGN KEY (owner_account_id) REFERENCES twitter_account(id)
-            )
-        ''')
-        
-        # Create list_membership table
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS list_membership (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                list_id INTEGER NOT NULL,
-                account_id INTEGER NOT NULL,
-                added_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (list_id) REFERENCES twitter_list(id) ON DELETE CASCADE,
-                FOREIGN KEY (account_id) REFERENCES twitter_account(id) ON DELETE CASCADE,
-                UNIQUE(list_id, account_id)
-            )
-        ''')
-        
-        # Insert API key from environment if not exists
-        if VALID_API_KEY:
-            key_hash = hashlib.sha256(VALID_API_KEY.encode()).hexdigest()
-            try:
-                conn.execute('INSERT INTO api_key (key_hash) VALUES (?)', (key_hash,))
-                print("API key added to database")
-            except sqlite3.IntegrityError:
-                pass  # Key already exists
-        
-        conn.commit()
-        conn.close()
-        print("Database initialized successfully")
+        # Dedicated connection rather than the thread-local pool, so nothing stays open after import
+        with closing(_open_db()) as conn:
+            # Run the schema setup as a single transaction; IMMEDIATE serializes concurrent workers
+            conn.executescript('''
+                BEGIN IMMEDIATE;
+                
+                CREATE TABLE IF NOT EXISTS api_key (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    key_hash TEXT UNIQUE NOT NULL,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    is_active BOOLEAN DEFAULT 1
+                );
+                
+                CREATE TABLE IF NOT EXISTS twitter_account (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT UNIQUE NOT NULL,
+                    access_token TEXT NOT NULL,
+                    access_token_secret TEXT,
+                    refresh_token TEXT,
+                    status TEXT DEFAULT 'active',
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    updated_at DATETIME
+                );
+                
+                CREATE TABLE IF NOT EXISTS tweet (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    twitter_account_id INTEGER NOT NULL,
+                    content TEXT NOT NULL,
+                    status TEXT DEFAULT 'pending',
+                    twitter_id TEXT,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    posted_at DATETIME,
+                    FOREIGN KEY (twitter_account_id) REFERENCES twitter_account (id)
+                );
+                
+                CREATE TABLE IF NOT EXISTS oauth_state (
+                    state TEXT PRIMARY KEY,
+                    code_verifier TEXT NOT NULL,
+                    created_at DATETIME NOT NULL
+                );
+                
+                CREATE TABLE IF NOT EXISTS twitter_list (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    list_id TEXT UNIQUE NOT NULL,
+                    name TEXT NOT NULL,
+                    description TEXT,
+                    mode TEXT DEFAULT 'private',
+                    owner_account_id INTEGER NOT NULL,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    updated_at DATETIME,
+                    FOREIGN KEY (owner_account_id) REFERENCES twitter_account(id)
+                );
+                
+                CREATE TABLE IF NOT EXISTS list_membership (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    list_id INTEGER NOT NULL,
+                    account_id INTEGER NOT NULL,
+                    added_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (list_id) REFERENCES twitter_list(id) ON DELETE CASCADE,
+                    FOREIGN KEY (account_id) REFERENCES twitter_account(id) ON DELETE CASCADE,
+                    UNIQUE(list_id, account_id)
+                );
+            ''')
+            
+            # Column migrations - skipped once the schema version is current
+            schema_version = conn.execute('PRAGMA user_version').fetchone()[0]
+            migrating = schema_version < SCHEMA_VERSION
+            if migrating:
+                # Add refresh_token column to twitter_account if it doesn't exist
+                try:
+                    conn.execute('ALTER TABLE twitter_account ADD COLUMN refresh_token TEXT')
+                    print("Added refresh_token column to twitter_account table")
+                except:
+                    pass  # Column already exists
+                
+                # Add updated_at column if it doesn't exist
+                try:
+                    conn.execute('ALTER TABLE twitter_account ADD COLUMN updated_at DATETIME')
+                    print("Added updated_at column to twitter_account table")
+                except:
+                    pass  # Column already exists
+                
+                # Add account_type column to twitter_account if it doesn't exist
+                try:
+                    conn.execute("ALTER TABLE twitter_account ADD COLUMN account_type TEXT DEFAULT 'managed'")
+                    print("Added account_type column to twitter_account table")
+                except:
+                    pass  # Column already exists
+                
+                # Add twitter_user_id column to twitter_account if it doesn't exist
+                try:
+                    conn.execute('ALTER TABLE twitter_account ADD COLUMN twitter_user_id TEXT')
+                    print("Added twitter_user_id column to twitter_account table")
+                except:
+                    pass  # Column already exists
+                
+                conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            
+            # Create indexes for the status, account and ordering scans
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_tweet_status_created ON tweet(status, created_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_tweet_account_status ON tweet(twitter_account_id, status)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_tweet_created ON tweet(created_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_account_status ON twitter_account(status)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_account_type_created ON twitter_account(account_type, created_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_list_owner ON twitter_list(owner_account_id)')
+            
+            # Insert API key from environment if not exists
+            if VALID_API_KEY:
+                try:
+                    conn.execute('INSERT INTO api_key (key_hash) VALUES (?)', (VALID_API_KEY_HASH,))
+                    print("API key added to database")
+                except sqlite3.IntegrityError:
+                    pass  # Key already exists
+            
+            conn.commit()
+            
+            # Refresh planner statistics so the indexes above get used - only when the schema changed,
+            # since ANALYZE scans every table and index
+            if migrating:
+                conn.execute('ANALYZE')
+            print("Database initialized successfully")
     except Exception as e:
         print(f"Error initializing database: {e}")
 
+# Create tables and run column migrations on import, so WSGI servers (gunicorn app:app) get them too
+init_database()
+
 if __name__ == '__main__':
     print(f"Database path: {DB_PATH}")
     print(f"Database exists: {os.path.exists(DB_PATH)}")
     print(f"Twitter Callback URL: {TWITTER_CALLBACK_URL}")
     
-    # Initialize database
-    init_database()
-    
     # Run the app
     print("\n>>> Starting Simple Twitter Manager API")
     print(">>> API endpoints available at: http://localhost:5555/api/v1/")
@@ -25,8 +25,13 @@ if [ ! -f "$DB_PATH" ]; then
 fi
 
 # Create backup
+# The database runs in WAL mode, so recent commits may live only in the -wal file;
+# use SQLite's online backup instead of cp to get a consistent, complete snapshot
 echo "Creating backup: $BACKUP_NAME"
-cp $DB_PATH "$BACKUP_DIR/$BACKUP_NAME"
+if ! sqlite3 "$DB_PATH" ".backup '$BACKUP_DIR/$BACKUP_NAME'"; then
+    echo -e "${RED}Error: sqlite3 backup failed${NC}"
+    exit 1
+fi
 
 # Compress the backup
 gzip "$BACKUP_DIR/$BACKUP_NAME"